@@ -1,17 +1,16 @@
 import enum
 
 
-class PrintColour(enum.Enum):
-    RED = "\033[91m"
-    GREEN = "\033[92m"
-    YELLOW = "\033[93m"
-    BLUE = "\033[94m"
-    PURPLE = "\033[95m"
-    CYAN = "\033[96m"
-    RESET = "\033[0m"
+class PrintColour:
+    """ANSI escape codes, kept as plain strings so they interpolate into messages directly."""
 
-    def __str__(self) -> str:
-        return self.value
+    RED: str = "\033[91m"
+    GREEN: str = "\033[92m"
+    YELLOW: str = "\033[93m"
+    BLUE: str = "\033[94m"
+    PURPLE: str = "\033[95m"
+    CYAN: str = "\033[96m"
+    RESET: str = "\033[0m"
 
 
 class Language(enum.Enum):
@@ -26,8 +25,11 @@ class Language(enum.Enum):
         return self.value
 
     @staticmethod
-    def options() -> list[str]:
-        return [v.value for v in Language.__members__.values()]
+    def options() -> tuple[str, ...]:
+        return LANGUAGE_OPTIONS
+
+
+LANGUAGE_OPTIONS = tuple(v.value for v in Language.__members__.values())
 
 
 class OpenAIModel(enum.Enum):
@@ -35,8 +37,11 @@ class OpenAIModel(enum.Enum):
     GPT_4_TURBO = "gpt-4-1106-preview"
 
     @staticmethod
-    def options() -> list[str]:
-        return [v.value for v in OpenAIModel.__members__.values()]
+    def options() -> tuple[str, ...]:
+        return OPENAI_MODEL_OPTIONS
+
+
+OPENAI_MODEL_OPTIONS = tuple(v.value for v in OpenAIModel.__members__.values())
 
 
 OPENAI_SYSTEM_PROMPT = """
@@ -154,3 +159,15 @@ Language from: {language_from}
 Language to: {language_to}
 Word to translate: {word_to_translate}
 """
+
+
+OPENAI_BATCH_USER_PROMPT = """
+Language from: {language_from}
+Language to: {language_to}
+Words to translate: {words_to_translate}
+
+This time you have been given several words, separated by newlines. Respond with a JSON object of
+the form {{"results": [{{"word": ..., "translations": [...]}}]}}, with one result for each word to
+translate, in the same order as the words were given. "word" must be exactly as given, and
+"translations" must follow the format described above for a single word.
+"""
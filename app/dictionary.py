@@ -1,28 +1,201 @@
+import asyncio
+import pickle
+import sqlite3
+
 from app.language_element import Translation
+from app.log import logger
 from app.retriever import Retriever
 
+# SQLite limits the number of parameters in a query, so bulk cache lookups are split into chunks
+CACHE_LOOKUP_CHUNK_SIZE = 500
+
 
 class Dictionary:
     """
     A class responsible for providing translations for words. It does this by first checking if it
     already has a translation for a given word, and if not, using a Retriever to retrieve a list of
-    translations.
+    translations. If a cache path is provided, retrieved translations are also persisted to an
+    SQLite database so that subsequent runs can skip the Retriever entirely for known words.
     """
 
     retriever: Retriever | None
     translations: dict[str, list[Translation]]
+    cache_connection: sqlite3.Connection | None
+    locks: dict[str, asyncio.Lock]
 
-    def __init__(self, retriever: Retriever | None = None) -> None:
+    def __init__(self, retriever: Retriever | None = None, cache_path: str | None = None) -> None:
         self.retriever = retriever
         self.translations = {}
+        self.cache_connection = None
+        self.locks = {}
+        if cache_path:
+            self.cache_connection = sqlite3.connect(cache_path)
+            self.cache_connection.execute("PRAGMA journal_mode=WAL")
+            # In WAL mode this skips the fsync on every commit, which would otherwise stall the
+            # event loop once per word. A crash can only lose recent entries, not corrupt the cache
+            self.cache_connection.execute("PRAGMA synchronous=NORMAL")
+            self.cache_connection.execute(
+                "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB)"
+            )
+            self.cache_connection.commit()
+
+    def _cache_key(self, word: str) -> str:
+        """
+        Returns the key under which translations for a given word are persisted. The key includes
+        everything about the retriever that affects its output, so that caches can be shared
+        between runs with different configurations.
+        """
+        assert self.retriever is not None
+        return ":".join(
+            [
+                self.retriever.__class__.__name__,
+                self.retriever.language_from.value,
+                self.retriever.language_to.value,
+                "concise" if self.retriever.concise_mode else "full",
+                word,
+            ]
+        )
+
+    def _unpickle_translations(self, value: bytes) -> list[Translation] | None:
+        """Returns the translations stored in a persisted value, or None if it cannot be read."""
+        try:
+            translations: list[Translation] = pickle.loads(value)
+        except Exception:
+            return None  # Entries written by an incompatible version are retrieved again
+        for translation in translations:
+            translation.retriever = self.retriever  # Retrievers are not persisted
+        return translations
+
+    def _load_from_cache(self, key: str) -> list[Translation] | None:
+        """Returns the persisted translations for a given key, or None if there are none."""
+        assert self.cache_connection is not None
+        row = self.cache_connection.execute(
+            "SELECT value FROM cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        return self._unpickle_translations(row[0])
+
+    def _load_many_from_cache(self, words: list[str]) -> dict[str, list[Translation]]:
+        """
+        Returns the persisted translations for many words at once, keyed by word. Words are looked
+        up in chunks, each with a single query, rather than with a query per word.
+        """
+        assert self.cache_connection is not None
+        words_by_key = {self._cache_key(word): word for word in words}
+        keys = list(words_by_key)
+        loaded: dict[str, list[Translation]] = {}
+        for i in range(0, len(keys), CACHE_LOOKUP_CHUNK_SIZE):
+            chunk = keys[i : i + CACHE_LOOKUP_CHUNK_SIZE]
+            rows = self.cache_connection.execute(
+                "SELECT key, value FROM cache WHERE key IN (%s)" % ",".join("?" * len(chunk)),
+                chunk,
+            )
+            for key, value in rows:
+                translations = self._unpickle_translations(value)
+                if translations is not None:
+                    loaded[words_by_key[key]] = translations
+        return loaded
+
+    def _save_to_cache(self, key: str, translations: list[Translation]) -> None:
+        """Persists the translations for a given key, replacing any existing entry."""
+        self._save_many_to_cache({key: translations})
+
+    def _save_many_to_cache(self, translations_by_key: dict[str, list[Translation]]) -> None:
+        """Persists the translations for many keys in a single transaction."""
+        assert self.cache_connection is not None
+        self.cache_connection.executemany(
+            "INSERT OR REPLACE INTO cache (key, value) VALUES (?, ?)",
+            [
+                (key, pickle.dumps(translations))
+                for key, translations in translations_by_key.items()
+            ],
+        )
+        self.cache_connection.commit()
+
+    def load_cached(self, words: list[str]) -> None:
+        """
+        Loads the persisted translations for many words in bulk, so that later calls to translate
+        can be answered for those words without a query or request per word.
+        """
+        if self.retriever is None or self.cache_connection is None:
+            return
+        words_to_load = [word for word in words if word not in self.translations]
+        self.translations.update(self._load_many_from_cache(words_to_load))
+
+    async def prefetch(self, words: list[str], concurrency_limit: int = 1) -> None:
+        """
+        Loads translations for many words ahead of time, so that later calls to translate can be
+        answered without a request per word. Words in the persistent cache are loaded in bulk, and
+        if the Retriever supports batching the rest are retrieved in batches of its batch size.
+        Words that a batch fails to retrieve are left for translate to retrieve individually.
+        """
+        if self.retriever is None:
+            return
+        retriever = self.retriever
+        self.load_cached(words)
+        if retriever.batch_size <= 1:
+            return
+        words_to_retrieve = [word for word in words if word not in self.translations]
+        logger.info(
+            f"Retrieving translations for {len(words_to_retrieve)} words in batches of {retriever.batch_size}"
+        )
+
+        semaphore = asyncio.Semaphore(concurrency_limit)
+
+        async def retrieve_batch(batch: list[str]) -> None:
+            async with semaphore:
+                try:
+                    batch_translations = await retriever.retrieve_translations_batch(batch)
+                except Exception as e:
+                    logger.warning(f"Error retrieving a batch of {len(batch)} words: {e}")
+                    return
+            self.translations.update(batch_translations)
+            if self.cache_connection is not None:
+                self._save_many_to_cache(
+                    {self._cache_key(word): t for word, t in batch_translations.items()}
+                )
+
+        batch_size = retriever.batch_size
+        await asyncio.gather(
+            *[
+                retrieve_batch(words_to_retrieve[i : i + batch_size])
+                for i in range(0, len(words_to_retrieve), batch_size)
+            ]
+        )
 
     async def translate(self, word: str) -> list[Translation]:
         """
         Returns a list of Translation objects for a given word. If the word is not already in the
-        dictionary, it uses its Retriever (if one is associated) to retrieve a list of translations.
+        dictionary, it checks the persistent cache (if one is configured) and then uses its
+        Retriever (if one is associated) to retrieve a list of translations. Concurrent requests
+        for the same word share a single retrieval.
         """
-        if word not in self.translations:
-            if self.retriever is None:
-                return []
-            self.translations[word] = await self.retriever.retrieve_translations(word)
+        if word in self.translations:
+            return self.translations[word]
+        if self.retriever is None:
+            return []
+        lock = self.locks.setdefault(word, asyncio.Lock())
+        try:
+            async with lock:
+                if word not in self.translations:
+                    translations = None
+                    if self.cache_connection is not None:
+                        translations = self._load_from_cache(self._cache_key(word))
+                    if translations is None:
+                        translations = await self.retriever.retrieve_translations(word)
+                        if self.cache_connection is not None:
+                            self._save_to_cache(self._cache_key(word), translations)
+                    self.translations[word] = translations
+        finally:
+            # Later calls for a retrieved word return before reaching the lock, so it can be freed
+            if self.locks.get(word) is lock:
+                del self.locks[word]
         return self.translations[word]
+
+    def close(self) -> None:
+        """Closes the connection to the persistent cache, if one is open."""
+        self.locks.clear()
+        if self.cache_connection is not None:
+            self.cache_connection.close()
+            self.cache_connection = None
@@ -1,7 +1,15 @@
-class RateLimitException(Exception):
+class NoteLimitReachedException(Exception):
     pass
 
 
+class RateLimitException(Exception):
+    retry_after: float | None  # Seconds the server asked clients to wait, if it said
+
+    def __init__(self, retry_after: float | None = None) -> None:
+        super().__init__()
+        self.retry_after = retry_after
+
+
 class RedirectException(Exception):
     response_url: str
 
@@ -1,70 +1,169 @@
 import argparse
-import json
+import contextlib
 import os
+import pathlib
+import shutil
 import sqlite3
+import tempfile
 import zipfile
-from typing import Any
+from collections import defaultdict
+from typing import Any, Iterator
 
-from genanki import Deck, Model, Note
+import orjson
+from genanki import Deck, Model, Note, Package
+from genanki.apkg_col import APKG_COL
+from genanki.apkg_schema import APKG_SCHEMA
+from genanki.note import _fix_deprecated_builtin_models_and_warn
 
 from app.constant import PrintColour as PC
 
+ZIP_READ_BUFFER_SIZE = 1 << 20  # 1 MiB
+NOTE_INSERT_BATCH_SIZE = 10_000
 
-def load_decks_from_package(apkg_filepath: str) -> list[Deck]:
+
+class BatchedPackage(Package):  # type: ignore[misc]
     """
-    A custom extension to the genanki library that allows for the loading of Anki decks from .apkg
-    files. Should look into submitting a pull request to the genanki library to add this
-    functionality to the library itself.
+    A custom extension to the genanki Package class that writes notes and cards to the collection
+    database with executemany in batches, rather than with one execute call per row, so that SQLite
+    can reuse a single prepared statement for each batch.
     """
-    with zipfile.ZipFile(apkg_filepath, "r") as z:
-        z.extractall("/tmp")  # Extracts to a temporary directory
-        db_path = "/tmp/collection.anki2"  # Path to the SQLite database
-
-    # Connect to the SQLite Database
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-
-    # Fetch Decks
-    cursor.execute("SELECT decks FROM col")
-    decks_json = cursor.fetchone()[0]
-    decks_data: dict[str, dict[str, Any]] = json.loads(decks_json)
-
-    # Fetch Models
-    cursor.execute("SELECT models FROM col")
-    models_json = cursor.fetchone()[0]
-    models_data: dict[str, dict[str, Any]] = json.loads(models_json)
-
-    # Create Deck Objects
-    loaded_decks: list[Deck] = []
-    for deck_id, deck_info in decks_data.items():
-        if deck_id == "1":
-            continue
-        deck = Deck(deck_id=deck_id, name=deck_info["name"])
-
-        # Fetch Notes for this Deck
-        cursor.execute(
-            "SELECT id, mid, flds FROM notes WHERE id IN (SELECT nid FROM cards WHERE did=?)",
-            (deck_id,),
-        )
-        notes = cursor.fetchall()
-
-        # Create Note Objects
-        for _, model_id, flds in notes:
-            model_data = models_data[str(model_id)]
-            model = Model(
-                model_id=model_id,
-                name=model_data["name"],
-                fields=[{"name": fn} for fn in model_data["flds"]],
+
+    def write_to_db(self, cursor: sqlite3.Cursor, timestamp: float, id_gen: Iterator[int]) -> None:
+        cursor.executescript(APKG_SCHEMA)
+        cursor.executescript(APKG_COL)
+
+        for deck in self.decks:
+            # Let genanki write the deck and model JSON, then insert the notes here instead
+            notes, deck.notes = deck.notes, []
+            for note in notes:
+                deck.add_model(note.model)
+            try:
+                deck.write_to_db(cursor, timestamp, id_gen)
+            finally:
+                deck.notes = notes
+            for i in range(0, len(notes), NOTE_INSERT_BATCH_SIZE):
+                self._write_notes_to_db(
+                    cursor, timestamp, deck.deck_id, id_gen, notes[i : i + NOTE_INSERT_BATCH_SIZE]
+                )
+
+    @staticmethod
+    def _write_notes_to_db(
+        cursor: sqlite3.Cursor,
+        timestamp: float,
+        deck_id: int,
+        id_gen: Iterator[int],
+        notes: list[Note],
+    ) -> None:
+        """
+        Writes a batch of notes and their cards to the database, producing the same rows (and
+        consuming IDs in the same order) as genanki's Note.write_to_db and Card.write_to_db.
+        """
+        # Mirrors Note.write_to_db and Card.write_to_db from genanki 0.13.1 (pinned in
+        # requirements.txt), including their private helpers, so must be checked on any upgrade
+        mod = int(timestamp)
+        note_rows: list[tuple[Any, ...]] = []
+        card_rows: list[tuple[Any, ...]] = []
+        for note in notes:
+            note.fields = _fix_deprecated_builtin_models_and_warn(note.model, note.fields)
+            note._check_number_model_fields_matches_num_fields()
+            note._check_invalid_html_tags_in_fields()
+            note_id = next(id_gen)
+            note_rows.append(
+                (
+                    note_id,  # id
+                    note.guid,  # guid
+                    note.model.model_id,  # mid
+                    mod,  # mod
+                    -1,  # usn
+                    note._format_tags(),  # tags
+                    note._format_fields(),  # flds
+                    note.sort_field,  # sfld
+                    0,  # csum
+                    0,  # flags
+                    "",  # data
+                )
             )
-            note = Note(model=model, fields=flds.split("\x1f"))
-            deck.add_note(note)
+            for card in note.cards:
+                queue = -1 if card.suspend else 0
+                card_rows.append(
+                    (next(id_gen), note_id, deck_id, card.ord, mod, -1, 0, queue, note.due)
+                    + (0,) * 8  # ivl, factor, reps, lapses, left, odue, odid, flags
+                    + ("",)  # data
+                )
+        cursor.executemany("INSERT INTO notes VALUES(?,?,?,?,?,?,?,?,?,?,?);", note_rows)
+        cursor.executemany(
+            "INSERT INTO cards VALUES(?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?);", card_rows
+        )
 
-        loaded_decks.append(deck)
 
-    conn.close()
+def _load_decks_from_collection(db_path: str) -> list[Deck]:
+    """Loads the Anki decks stored in a given collection.anki2 SQLite database."""
+    db_uri = f"{pathlib.Path(db_path).as_uri()}?mode=ro"
+    with contextlib.closing(sqlite3.connect(db_uri, uri=True)) as conn:
+        # The database is only ever read, so durability guarantees can be relaxed
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA cache_size=-65536")  # 64 MiB
+        cursor = conn.cursor()
+
+        # Fetch Decks and Models
+        cursor.execute("SELECT decks, models FROM col")
+        decks_json, models_json = cursor.fetchone()
+        decks_data: dict[str, dict[str, Any]] = orjson.loads(decks_json)
+        models_data: dict[str, dict[str, Any]] = orjson.loads(models_json)
+
+        # Fetch Notes for all Decks in a single query, grouped by deck ID
+        cursor.execute(
+            "SELECT DISTINCT cards.did, notes.id, notes.mid, notes.flds FROM notes "
+            "JOIN cards ON cards.nid = notes.id ORDER BY notes.id"
+        )
+        notes_by_deck_id: defaultdict[int, list[tuple[int, str]]] = defaultdict(list)
+        for did, _, model_id, flds in cursor.fetchall():
+            notes_by_deck_id[did].append((model_id, flds))
+
+        # Create Deck Objects, sharing one Model object between all notes with the same model ID
+        models: dict[int, Model] = {}
+        loaded_decks: list[Deck] = []
+        for deck_id, deck_info in decks_data.items():
+            if deck_id == "1":
+                continue
+            deck = Deck(deck_id=deck_id, name=deck_info["name"])
+
+            # Create Note Objects
+            for model_id, flds in notes_by_deck_id[int(deck_id)]:
+                if (model := models.get(model_id)) is None:
+                    model_data = models_data[str(model_id)]
+                    model = models[model_id] = Model(
+                        model_id=model_id,
+                        name=model_data["name"],
+                        fields=[{"name": fn} for fn in model_data["flds"]],
+                    )
+                note = Note(model=model, fields=flds.split("\x1f"))
+                deck.add_note(note)
+
+            loaded_decks.append(deck)
     return loaded_decks
 
 
+def load_decks_from_package(apkg_filepath: str) -> list[Deck]:
+    """
+    A custom extension to the genanki library that allows for the loading of Anki decks from .apkg
+    files. Should look into submitting a pull request to the genanki library to add this
+    functionality to the library itself.
+    """
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # Only the SQLite database is needed, so media files are left in the archive
+        db_path = os.path.join(temp_dir, "collection.anki2")
+        with (
+            open(apkg_filepath, "rb", buffering=ZIP_READ_BUFFER_SIZE) as apkg_file,
+            zipfile.ZipFile(apkg_file, "r") as z,
+            z.open("collection.anki2") as src,
+            open(db_path, "wb") as dst,
+        ):
+            shutil.copyfileobj(src, dst, length=ZIP_READ_BUFFER_SIZE)
+        return _load_decks_from_collection(db_path)
+
+
 def main(args: argparse.Namespace) -> None:
     """
     Allows you to quickly see what is inside an .apkg file.
@@ -74,8 +173,9 @@ def main(args: argparse.Namespace) -> None:
             raise FileNotFoundError(f"File '{args.apkg_filepath}' does not exist")
 
         decks = load_decks_from_package(args.apkg_filepath)
+        deck_count = len(decks)
         print(
-            f"Loaded {len(decks)} deck{'s' if len(decks) > 1 else ''} from '{args.apkg_filepath}'"
+            f"Loaded {deck_count} deck{'s' if deck_count > 1 else ''} from '{args.apkg_filepath}'"
         )
         print()
         for deck in decks[: args.max_display_decks]:
@@ -1,4 +1,5 @@
-from typing import TYPE_CHECKING, Optional
+import sys
+from typing import TYPE_CHECKING, Any, Optional
 
 if TYPE_CHECKING:
     from app.retriever import Retriever
@@ -17,6 +18,9 @@ class SentencePair:
     word.
     """
 
+    # Many sentence pairs are held per word, so instances are slotted rather than given a __dict__
+    __slots__ = ("source_sentence", "target_sentence", "definition")
+
     source_sentence: str
     target_sentence: str
     definition: "Definition"
@@ -67,6 +71,8 @@ class Definition:
             - "bench" (seat)
     """
 
+    __slots__ = ("text", "sentence_pairs", "translation")
+
     text: str
     sentence_pairs: list[SentencePair]
     translation: "Translation"
@@ -134,6 +140,12 @@ class Translation:
     def __repr__(self) -> str:
         return f"{self.__class__.__name__}(word_to_translate={self.word_to_translate}, part_of_speech={self.part_of_speech})"
 
+    def __getstate__(self) -> dict[str, Any]:
+        # Retrievers hold network clients that cannot be pickled, so are dropped when persisting
+        state = self.__dict__.copy()
+        state["retriever"] = None
+        return state
+
     def __init__(
         self,
         word_to_translate: str,
@@ -149,7 +161,8 @@ class Translation:
         if not definitions:
             raise ValueError("Definitions cannot be empty.")
         self.word_to_translate = word_to_translate
-        self.part_of_speech = part_of_speech
+        # Parts of speech come from a small set, so one string object is shared between translations
+        self.part_of_speech = sys.intern(part_of_speech)
         self.retriever = retriever
         self._set_definitions(definitions, max_definitions)
 
@@ -10,9 +10,9 @@ class CustomFormatter(logging.Formatter):
     FORMATS = {
         DEBUG: FORMAT,
         INFO: FORMAT,
-        WARNING: PC.YELLOW.value + FORMAT + PC.RESET.value,
-        ERROR: PC.RED.value + FORMAT + PC.RESET.value,
-        CRITICAL: PC.RED.value + FORMAT + PC.RESET.value,
+        WARNING: PC.YELLOW + FORMAT + PC.RESET,
+        ERROR: PC.RED + FORMAT + PC.RESET,
+        CRITICAL: PC.RED + FORMAT + PC.RESET,
     }
 
     def format(self, record: logging.LogRecord) -> str:
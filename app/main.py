@@ -1,32 +1,38 @@
 import argparse
 import asyncio
+import math
 import os
 import random
 import re
 from datetime import datetime
-from functools import partial
+from functools import lru_cache, partial
+from typing import Any, Sequence
 
 from genanki import Deck as AnkiDeck
 from genanki import Note as AnkiNote
-from genanki import Package as AnkiPackage
 from setuptools_scm import get_version
 
 from app.constant import Language
 from app.constant import PrintColour as PC
 from app.dictionary import Dictionary
+from app.exception import NoteLimitReachedException
+from app.genanki_extension import BatchedPackage
 from app.log import DEBUG, logger
 from app.note_creator import NoteCreator
 from app.retriever import (
     Retriever,
     RetrieverFactory,
     RetrieverType,
+    WebsiteScraper,
     valid_retriever_type,
 )
 from app.source import AnkiPackageSource, CSVSource, SimpleSource, Source
 
+FILE_EXTENSION_PATTERN = re.compile(r"\.\w{1,5}$")
+
 
 def valid_input_path(file_extension: str, path: str) -> str:
-    assert re.match(r"\.\w{1,5}$", file_extension), "Invalid file extension format"
+    assert FILE_EXTENSION_PATTERN.match(file_extension), "Invalid file extension format"
 
     if not os.path.isfile(path):  # Check if the file exists
         raise argparse.ArgumentTypeError(f"File {path} does not exist.")
@@ -37,6 +43,21 @@ def valid_input_path(file_extension: str, path: str) -> str:
     return path
 
 
+def deduplicate_words(words: list[str]) -> list[str]:
+    """
+    Removes duplicates from a list of words, preserving order. Words are stripped of surrounding
+    whitespace and compared case-insensitively, with the first occurrence of each word kept.
+    """
+    seen = set()
+    unique_words: list[str] = []
+    for word in words:
+        word = word.strip()
+        if word and (key := word.lower()) not in seen:
+            seen.add(key)
+            unique_words.append(word)
+    return unique_words
+
+
 def valid_output_anki_package_path(path: str) -> str:
     if not os.path.isdir(os.path.dirname(path)):  # Check if the directory of the file exists
         raise argparse.ArgumentTypeError(f"Directory {os.path.dirname(path)} does not exist.")
@@ -50,6 +71,18 @@ def valid_output_anki_package_path(path: str) -> str:
     return path
 
 
+def valid_positive_float(value: str) -> float:
+    try:
+        number = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"{value} is not a number.")
+
+    if not math.isfinite(number) or number <= 0:  # Rejects nan and inf as well as non-positives
+        raise argparse.ArgumentTypeError(f"{value} must be a positive number.")
+
+    return number
+
+
 async def create_deck(
     words_to_translate: list[str],
     retriever: Retriever,
@@ -57,74 +90,149 @@ async def create_deck(
     note_limit: int = 0,
     output_anki_package_path: str = "output.apkg",
     output_anki_deck_name: str = "Language learning flashcards",
+    cache_path: str | None = None,
 ) -> None:
     """
     Creates a new Anki deck containing language learning flashcards with translations and example
     sentences for a given set of words.
     """
+    words_to_translate = deduplicate_words(words_to_translate)
     if not words_to_translate:
         logger.warning("No words to translate, exiting")
         return
     deck_id = random.randint(1_000_000_000, 5_000_000_000)
+    dictionary = Dictionary(retriever=retriever, cache_path=cache_path)
     note_creator = NoteCreator(
         deck_id=deck_id,
-        dictionary=Dictionary(retriever=retriever),
+        dictionary=dictionary,
         concurrency_limit=concurrency_limit,
     )
     logger.info(f"Processing {len(words_to_translate)} words")
-    tasks: list[asyncio.Task[list[AnkiNote]]] = []
-    for word_to_translate in words_to_translate:
-        coro = note_creator.rate_limited_create_notes(word_to_translate)
-        task = asyncio.create_task(coro)
-        tasks.append(task)
-
-    max_word_length = max([len(word) for word in words_to_translate])
-    words_processed, notes_to_create = 0, 0
-    all_new_notes: list[AnkiNote] = []
+
+    # A fixed pool of workers pulls words from a queue, so the number of tasks is bounded by the
+    # concurrency limit rather than growing with the number of words
+    word_queue: asyncio.Queue[str] = asyncio.Queue()
+    result_queue: asyncio.Queue[list[AnkiNote]] = asyncio.Queue(
+        maxsize=note_creator.concurrency_limit
+    )
+
+    async def worker() -> None:
+        while not word_queue.empty():
+            word_to_translate = word_queue.get_nowait()
+            try:
+                new_notes = await note_creator.rate_limited_create_notes(word_to_translate)
+            except Exception as e:
+                # An error escaping a worker would cancel the whole task group, losing every note
+                logger.error(f"Error processing '{word_to_translate}': {e}")
+                new_notes = []
+            await result_queue.put(new_notes)
+
+    # The progress log layout is fixed for the whole run, so its template is only built once
+    total_words = len(words_to_translate)
+    max_word_length = max(map(len, words_to_translate), default=0)
+    progress_template = f"{PC.PURPLE}(%{len(str(total_words))}d/{total_words}){PC.RESET} - Prepared {PC.GREEN}%d{PC.RESET} notes for word {PC.CYAN}%-{max_word_length}s{PC.RESET} - {PC.PURPLE}total notes to create: %d{PC.RESET}"
+    notes_to_create = 0
+    deck = AnkiDeck(deck_id, output_anki_deck_name)  # Notes are added as soon as they are ready
     try:
-        for completed_task in asyncio.as_completed(tasks):
-            new_notes: list[AnkiNote] = await completed_task
-            words_processed += 1
-            if not new_notes:
-                continue
-            all_new_notes.extend(new_notes)
-            notes_to_create += len(new_notes)
-            logger.debug(
-                f"{PC.PURPLE}({words_processed:{len(str(len(tasks)))}}/{len(tasks)}){PC.RESET} - Prepared {PC.GREEN}{len(new_notes)}{PC.RESET} notes for word {PC.CYAN}{new_notes[0].fields[1]:{max_word_length}}{PC.RESET} - {PC.PURPLE}total notes to create: {notes_to_create}{PC.RESET}"
-            )
-            if note_limit and notes_to_create >= note_limit:
-                logger.info(f"Note limit of {note_limit} reached - stopping processing")
-                break
+        if note_limit:
+            # Batches would retrieve words far beyond the note limit, so only the cache is read. The
+            # source order is kept, so the notes in the deck do not depend on what is cached
+            dictionary.load_cached(words_to_translate)
+        else:
+            await dictionary.prefetch(words_to_translate, note_creator.concurrency_limit)
+            # Words with known translations need no requests, so are queued first. They are then
+            # never held up behind a rate limit or request pacing
+            words_to_translate.sort(key=lambda word: word not in dictionary.translations)
+        for word_to_translate in words_to_translate:
+            word_queue.put_nowait(word_to_translate)
+
+        # The task group cancels any workers still running when the note limit is reached
+        async with asyncio.TaskGroup() as task_group:
+            for _ in range(note_creator.concurrency_limit):
+                task_group.create_task(worker())
+            # Every word produces exactly one result, as workers handle errors for each word
+            for words_processed in range(1, total_words + 1):
+                new_notes = await result_queue.get()
+                if not new_notes:
+                    continue
+                deck.notes.extend(new_notes)  # Equivalent to calling deck.add_note for each note
+                notes_to_create += len(new_notes)
+                if logger.isEnabledFor(DEBUG):
+                    logger.debug(
+                        progress_template,
+                        words_processed,
+                        len(new_notes),
+                        new_notes[0].fields[1],
+                        notes_to_create,
+                    )
+                if note_limit and notes_to_create >= note_limit:
+                    logger.info(f"Note limit of {note_limit} reached - stopping processing")
+                    raise NoteLimitReachedException()
+    except* NoteLimitReachedException:
+        pass
     finally:
-        remaining_tasks = [task for task in tasks if not task.done()]
-        for task in remaining_tasks:
-            task.cancel()
-        if remaining_tasks:
-            # Set return_exceptions to True so that CancelledError exceptions are not raised
-            await asyncio.gather(*remaining_tasks, return_exceptions=True)
         await retriever.close_session()
+        dictionary.close()
 
-    if not all_new_notes:
+    if not deck.notes:
         logger.warning("No notes to create, exiting")
         return
 
-    logger.debug(f"Shuffling {len(all_new_notes)} notes")
-    random.shuffle(all_new_notes)
+    logger.debug(f"Shuffling {len(deck.notes)} notes")
+    random.shuffle(deck.notes)
 
     logger.info(
-        f"Creating Anki deck '{output_anki_deck_name}' (ID {deck_id}) with {len(all_new_notes)} notes"
+        f"Creating Anki deck '{output_anki_deck_name}' (ID {deck_id}) with {len(deck.notes)} notes"
     )
-    deck = AnkiDeck(deck_id, output_anki_deck_name)
-    for new_note in all_new_notes:
-        deck.add_note(note=new_note)
-        logger.debug(
-            f"Created note for translation {PC.CYAN}{new_note.fields[1]} ({new_note.fields[3]}){PC.RESET}"
-        )
-    AnkiPackage(deck).write_to_file(output_anki_package_path)
+    if logger.isEnabledFor(DEBUG):
+        for new_note in deck.notes:
+            logger.debug(
+                f"Created note for translation {PC.CYAN}{new_note.fields[1]} ({new_note.fields[3]}){PC.RESET}"
+            )
+    # Writing the package is blocking file I/O, so is kept off the event loop thread
+    await asyncio.to_thread(BatchedPackage(deck).write_to_file, output_anki_package_path)
     logger.info(f"Processing complete. Total web requests made: {retriever.requests_made}")
 
 
-def main() -> None:
+@lru_cache(maxsize=1)
+def cached_version() -> str:
+    """Returns the version of the package, which is only looked up via setuptools_scm once."""
+    return f"lexideck {get_version()}"
+
+
+class LazyVersionAction(argparse.Action):
+    """
+    An argparse action equivalent to action="version", except that the version string is only
+    looked up when --version is actually passed, rather than every time the parser is built.
+    """
+
+    def __init__(
+        self,
+        option_strings: list[str],
+        dest: str = argparse.SUPPRESS,
+        default: str = argparse.SUPPRESS,
+        help: str | None = None,
+    ) -> None:
+        super().__init__(
+            option_strings=option_strings, dest=dest, default=default, nargs=0, help=help
+        )
+
+    def __call__(
+        self,
+        parser: argparse.ArgumentParser,
+        namespace: argparse.Namespace,
+        values: str | Sequence[Any] | None,
+        option_string: str | None = None,
+    ) -> None:
+        parser.exit(message=f"{cached_version()}\n")
+
+
+@lru_cache(maxsize=1)
+def _build_parser() -> argparse.ArgumentParser:
+    """
+    Builds the command line argument parser. The parser is cached so that repeated programmatic
+    calls to main do not rebuild it.
+    """
     parser = argparse.ArgumentParser(
         description="Create Anki deck for language learning. Provide either --words, --input-anki-package-path, --input-anki-deck-name and --input-anki-field-name, or --csv as a source of words"
     )
@@ -202,6 +310,13 @@ def main() -> None:
         action="store_true",
         help="Concise mode changes the behaviour of the retriever to prune translations and definitions, typically leading to a smaller deck with more concise flashcards.",
     )
+    retriever_group.add_argument(
+        "-rps",
+        "--max-requests-per-second",
+        type=valid_positive_float,
+        default=None,
+        help="Maximum number of requests per second that website scrapers send, spacing requests out to avoid rate limiting. Unlimited by default",
+    )
 
     # Note creator arguments
     note_creator_group = parser.add_argument_group(title="Note creator arguments")
@@ -235,16 +350,29 @@ def main() -> None:
     misc_group.add_argument(
         "-nl", "--note-limit", type=int, default=0, help="Maximum number of notes to create"
     )
+    misc_group.add_argument(
+        "--cache-path",
+        type=str,
+        default=None,
+        help="Path to an SQLite file in which to persist retrieved translations between runs. The cache is stored with pickle, so only use cache files that you created yourself, as loading an untrusted one can execute arbitrary code",
+    )
     misc_group.add_argument("--verbose", action="store_true", help="Enable verbose logging")
     misc_group.add_argument(
         "--version",
-        action="version",
-        version=f"lexideck {get_version()}",
+        action=LazyVersionAction,
         help="Show version number and exit",
     )
 
-    args = parser.parse_args()
+    return parser
+
 
+def main() -> None:
+    parser = _build_parser()
+    args = parser.parse_args()
+    if args.max_requests_per_second is not None and not issubclass(
+        args.retriever_type.value, WebsiteScraper
+    ):
+        parser.error("--max-requests-per-second only applies to website scraper retrievers")
     try:
         source: Source
         if args.words:
@@ -280,16 +408,23 @@ def main() -> None:
             language_from=args.language_from,
             language_to=args.language_to,
             concise_mode=args.concise_mode,
+            # The worker pool already bounds concurrent requests, so capping the website scrapers'
+            # connection pool at the same size is only a safeguard. The OpenAI client ignores it
+            connection_limit=args.concurrency_limit,
         )
+        if args.max_requests_per_second is not None:
+            assert isinstance(retriever, WebsiteScraper)
+            retriever.request_interval = 1 / args.max_requests_per_second
     except Exception as e:
         logger.error(e)
         exit(1)
 
-    current_date = datetime.now().strftime("%Y-%m-%d")
-    if not args.output_anki_package_path:
-        args.output_anki_package_path = f"{args.language_from.value}-{args.language_to.value}-{args.retriever_type}-{current_date}.apkg"
-    if not args.output_anki_deck_name:
-        args.output_anki_deck_name = f"{args.language_from.value.capitalize()} to {args.language_to.value.capitalize()} ({args.retriever_type.value.name()} - {current_date})"
+    if not args.output_anki_package_path or not args.output_anki_deck_name:
+        current_date = datetime.now().strftime("%Y-%m-%d")
+        if not args.output_anki_package_path:
+            args.output_anki_package_path = f"{args.language_from.value}-{args.language_to.value}-{args.retriever_type}-{current_date}.apkg"
+        if not args.output_anki_deck_name:
+            args.output_anki_deck_name = f"{args.language_from.value.capitalize()} to {args.language_to.value.capitalize()} ({args.retriever_type.value.name()} - {current_date})"
 
     if args.verbose:
         logger.setLevel(DEBUG)
@@ -302,6 +437,7 @@ def main() -> None:
             args.note_limit,
             args.output_anki_package_path,
             args.output_anki_deck_name,
+            args.cache_path,
         )
     )
 
@@ -1,4 +1,5 @@
 import asyncio
+import sys
 
 from genanki import Model as AnkiModel
 from genanki import Note as AnkiNote
@@ -8,6 +9,14 @@ from app.exception import RateLimitException, RedirectException
 from app.language_element import Translation
 from app.log import logger
 
+# HTML fragments used when building note fields, formatted with % for each note
+WORD_TO_TRANSLATE_LINK_HTML = "<a href='%s' style='color:red;'>%s</a>"
+DEFINITION_LINK_HTML = "<a href='%s' style='color:green;'>%s</a>"
+SENTENCE_INDEX_HTML = "<span style='color: darkgray'>[%d]</span> "
+
+# Sentence index prefixes are rendered once for the indices that notes realistically reach
+SENTENCE_INDEX_PREFIXES = tuple(SENTENCE_INDEX_HTML % i for i in range(1, 33))
+
 model = AnkiModel(
     1098765432,
     "Language learning flashcard model",
@@ -38,10 +47,12 @@ class NoteCreator:
     object.
     """
 
+    concurrency_limit: int
     deck_id: int
+    deck_id_field: str
     dictionary: Dictionary
     rate_limit_event: asyncio.Event
-    rate_limit_handling_event: asyncio.Event
+    rate_limit_lock: asyncio.Lock
     semaphore: asyncio.Semaphore
 
     # Handling redirect loops
@@ -50,13 +61,15 @@ class NoteCreator:
 
     def __init__(self, deck_id: int, dictionary: Dictionary, concurrency_limit: int = 1) -> None:
         self.deck_id = deck_id
+        self.deck_id_field = sys.intern(str(deck_id))  # Shared by every note in the deck
         self.dictionary = dictionary
         self.rate_limit_event = asyncio.Event()
         self.rate_limit_event.set()  # Setting the event allows all coroutines to proceed
-        self.rate_limit_handling_event = asyncio.Event()
+        self.rate_limit_lock = asyncio.Lock()  # Held by the coroutine handling a rate limit
         adjusted_concurrency_limit = min(max(concurrency_limit, 1), 5)  # Limit to 1-5
         if concurrency_limit != adjusted_concurrency_limit:
             logger.warning(f"Concurrency limit adjusted to {adjusted_concurrency_limit}")
+        self.concurrency_limit = adjusted_concurrency_limit
         self.semaphore = asyncio.Semaphore(adjusted_concurrency_limit)
         self.redirect_lock = asyncio.Lock()
         self.redirect_count = 0
@@ -68,56 +81,53 @@ class NoteCreator:
         """
         if len(sentences) == 1:
             return sentences[0]
-        else:
-            return "<br>".join(
-                [
-                    f"<span style='color: darkgray'>[{i}]</span> {s}"
-                    for i, s in enumerate(sentences, 1)
-                ]
-            )
+        # Fragments are appended to a single buffer and joined once
+        parts: list[str] = []
+        append = parts.append
+        prefixes = SENTENCE_INDEX_PREFIXES
+        for i, s in enumerate(sentences):
+            append(prefixes[i] if i < len(prefixes) else SENTENCE_INDEX_HTML % (i + 1))
+            append(s)
+            append("<br>")
+        if parts:
+            del parts[-1]  # No line break after the final sentence
+        return "".join(parts)
 
     def _create_note_from_translation(self, translation: Translation) -> AnkiNote:
         """Creates an AnkiNote object from a given Translation object."""
-        source_sentences, target_sentences = [], []
+        # Values that are constant across the definitions are bound to locals once, and a single
+        # pass over the definitions collects the sentences and the definition HTML
+        retriever = translation.retriever
+        word_to_translate = translation.word_to_translate
+        source_sentences: list[str] = []
+        target_sentences: list[str] = []
+        definition_html_components: list[str] = []
         for definition in translation.definitions:
-            source_sentences.append(definition.sentence_pairs[0].source_sentence)
-            target_sentences.append(definition.sentence_pairs[0].target_sentence)
+            sentence_pair = definition.sentence_pairs[0]
+            source_sentences.append(sentence_pair.source_sentence)
+            target_sentences.append(sentence_pair.target_sentence)
+            text = definition.text
+            link = retriever.reverse_link(text) if retriever else None
+            definition_html_components.append(DEFINITION_LINK_HTML % (link, text) if link else text)
 
         word_to_translate_html = (
-            (
-                f"<a href='{lang_from_url}' style='color:red;'>{translation.word_to_translate}</a>"
-                if (lang_from_url := translation.retriever.link(translation.word_to_translate))
-                else translation.word_to_translate
-            )
-            if translation.retriever
-            else translation.word_to_translate
+            WORD_TO_TRANSLATE_LINK_HTML % (lang_from_url, word_to_translate)
+            if retriever and (lang_from_url := retriever.link(word_to_translate))
+            else word_to_translate
         )
-        definition_html_components = []
-        for definition in translation.definitions:
-            if definition.translation.retriever:
-                link = definition.translation.retriever.reverse_link(definition.text)
-                if link:
-                    definition_html_components.append(
-                        f"<a href='{link}' style='color:green;'>{definition.text}</a>"
-                    )
-                    continue
-            definition_html_components.append(definition.text)
         definition_html = ", ".join(definition_html_components)
-        field_dict = {
-            "deck_id": str(
-                self.deck_id
-            ),  # Makes note unique to help Anki avoid updating existing notes on import
-            "word_to_translate": translation.word_to_translate,
-            "word_to_translate_html": word_to_translate_html,
-            "part_of_speech": translation.part_of_speech,
-            "definition_html": definition_html,
-            "source_sentences": self._combine_sentences(source_sentences),
-            "target_sentences": self._combine_sentences(target_sentences),
-        }
-        return AnkiNote(
-            model=model,
-            fields=list(field_dict.values()),
-        )
+        # Fields are positional and must follow the order of the fields declared on the model
+        fields = [
+            # deck_id - makes note unique to help Anki avoid updating existing notes on import
+            self.deck_id_field,
+            word_to_translate,  # word_to_translate
+            word_to_translate_html,  # word_to_translate_html
+            translation.part_of_speech,  # part_of_speech
+            definition_html,  # definition_html
+            self._combine_sentences(source_sentences),  # source_sentences
+            self._combine_sentences(target_sentences),  # target_sentences
+        ]
+        return AnkiNote(model=model, fields=fields)
 
     async def create_notes(self, word_to_translate: str) -> list[AnkiNote]:
         """
@@ -137,33 +147,38 @@ class NoteCreator:
         A wrapper and interface for the note creation method create_notes. This wrapper method
         provides rate limiting functionality, allowing only a certain number of coroutines to access
         the dictionary at a time. If a rate limit is detected, the coroutines will wait until the
-        rate limit has been lifted before proceeding. This method also handles multiple consecutive
-        redirects, which can occur for example when the website throws a captcha.
+        rate limit has been lifted before proceeding. This method also handles multiple
+        consecutive redirects, which can occur for example when the website throws a captcha.
         """
+        # No new requests are admitted while a rate limit is being handled, so coroutines that have
+        # not yet been rate limited do not keep sending requests to a server that is refusing them
+        await self.rate_limit_event.wait()
         async with self.semaphore:
             try:
                 return await self.create_notes(word_to_translate)
-            except RateLimitException:
-                # Check if this coroutine is the first to handle the rate limit
-                if not self.rate_limit_handling_event.is_set():
-                    # Indicate that rate limit handling is in progress
-                    self.rate_limit_handling_event.set()
-                    reset_time = 30
-                    logger.warning(f"Rate limit activated. Waiting {reset_time} seconds...")
-                    self.rate_limit_event.clear()
-                    await asyncio.sleep(reset_time)
-                    assert self.dictionary.retriever is not None
-                    while await self.dictionary.retriever.rate_limited():
-                        logger.warning(f"Rate limit still active. Waiting {reset_time} seconds...")
-                        await asyncio.sleep(reset_time)
-                    self.rate_limit_event.set()
-
-                    # Indicate that rate limit handling is complete
-                    self.rate_limit_handling_event.clear()
-                    logger.info("Rate limit deactivated")
-                else:
-                    # Wait for the first coroutine to finish handling the rate limit
+            except RateLimitException as e:
+                if self.rate_limit_lock.locked():
+                    # Wait for the coroutine holding the lock to finish handling the rate limit
                     await self.rate_limit_event.wait()
+                else:
+                    async with self.rate_limit_lock:
+                        reset_time = 30
+                        # Honour the server's Retry-After, so recovery is probed at the right time
+                        initial_wait = reset_time if e.retry_after is None else e.retry_after
+                        logger.warning(f"Rate limit activated. Waiting {initial_wait:g} seconds...")
+                        self.rate_limit_event.clear()
+                        try:
+                            await asyncio.sleep(initial_wait)
+                            assert self.dictionary.retriever is not None
+                            while await self.dictionary.retriever.rate_limited():
+                                logger.warning(
+                                    f"Rate limit still active. Waiting {reset_time} seconds..."
+                                )
+                                await asyncio.sleep(reset_time)
+                        finally:
+                            # Release waiting coroutines even if this one is cancelled
+                            self.rate_limit_event.set()
+                        logger.info("Rate limit deactivated")
                 return await self.create_notes(word_to_translate)
             except RedirectException as e:
                 logger.error(f"Error processing '{word_to_translate}': {e}")
@@ -2,8 +2,8 @@ import abc
 import argparse
 import asyncio
 import enum
+import functools
 import itertools
-import json
 import logging
 import os
 import re
@@ -13,16 +13,30 @@ from typing import Any
 
 import aiohttp
 import async_lru
+import orjson
 from bs4 import BeautifulSoup
-from bs4.element import Tag
+from bs4.element import NavigableString, Tag
 from dotenv import load_dotenv
 from openai import AsyncOpenAI
 
-from app.constant import OPENAI_SYSTEM_PROMPT, OPENAI_USER_PROMPT, Language, OpenAIModel
+from app.constant import (
+    OPENAI_BATCH_USER_PROMPT,
+    OPENAI_SYSTEM_PROMPT,
+    OPENAI_USER_PROMPT,
+    Language,
+    OpenAIModel,
+)
 from app.constant import PrintColour as PC
 from app.exception import RateLimitException, RedirectException
 from app.language_element import Definition, SentencePair, Translation
 
+PUNCTUATION_PATTERN = re.compile(r"[.,;:!?-]")
+ARTICLE_PATTERN = re.compile(r"^(el|la|el/la)\s+", flags=re.IGNORECASE)
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+# Each retriever talks to a single host, so its address is cached for longer than aiohttp's 10s
+DNS_CACHE_TTL = 300
+
 
 class Retriever(abc.ABC):
     """
@@ -33,18 +47,29 @@ class Retriever(abc.ABC):
 
     available_language_pairs: list[tuple[Language, Language]] = []  # Empty list means all pairs
     base_url: str
+    batch_size: int = 1  # Maximum number of words that can be retrieved with a single request
     concise_mode: bool = False
+    connection_limit: int = 100  # Maximum simultaneous HTTP connections, as per aiohttp's default
     language_from: Language
     language_to: Language
     requests_made: int = 0
     session: aiohttp.ClientSession | None = None
 
     def __init__(
-        self, language_from: Language, language_to: Language, concise_mode: bool = False
+        self,
+        language_from: Language,
+        language_to: Language,
+        concise_mode: bool = False,
+        connection_limit: int = 100,
     ) -> None:
         self.language_from = language_from
         self.language_to = language_to
         self.concise_mode = concise_mode
+        self.connection_limit = max(connection_limit, 1)  # aiohttp treats a limit of 0 as unlimited
+
+        # Links are pure functions of their input and are requested repeatedly across notes
+        self.link = functools.lru_cache(maxsize=4096)(self.link)  # type: ignore[method-assign]
+        self.reverse_link = functools.lru_cache(maxsize=4096)(self.reverse_link)  # type: ignore[method-assign]
         if (
             self.available_language_pairs
             and (self.language_from, self.language_to) not in self.available_language_pairs
@@ -56,7 +81,7 @@ class Retriever(abc.ABC):
     @staticmethod
     def _standardize(text: str) -> str:
         """Standardizes a given string by removing punctuation, whitespace, and capitalization."""
-        text = re.sub(r"[.,;:!?-]", "", text)
+        text = PUNCTUATION_PATTERN.sub("", text)
         return text.strip().lower()
 
     @staticmethod
@@ -67,7 +92,10 @@ class Retriever(abc.ABC):
     async def start_session(self) -> None:
         """Starts an asynchronous HTTP session."""
         if self.session is None or self.session.closed:
-            self.session = aiohttp.ClientSession()
+            connector = aiohttp.TCPConnector(
+                limit=self.connection_limit, ttl_dns_cache=DNS_CACHE_TTL
+            )
+            self.session = aiohttp.ClientSession(connector=connector)
 
     async def close_session(self) -> None:
         """Closes the asynchronous HTTP session."""
@@ -100,6 +128,15 @@ class Retriever(abc.ABC):
         """Retrieves translations for a given word."""
         raise NotImplementedError()
 
+    async def retrieve_translations_batch(
+        self, words_to_translate: list[str]
+    ) -> dict[str, list[Translation]]:
+        """
+        Retrieves translations for several words, keyed by word. Retrievers that can retrieve more
+        than one word per request override this method and set batch_size accordingly.
+        """
+        return {word: await self.retrieve_translations(word) for word in words_to_translate}
+
 
 class WebsiteScraper(Retriever, abc.ABC):
     """
@@ -107,6 +144,23 @@ class WebsiteScraper(Retriever, abc.ABC):
     parse HTML responses.
     """
 
+    next_request_time: float = 0.0  # Event loop time at which the next request may be sent
+    request_interval: float = 0.0  # Minimum seconds between requests, 0 meaning unpaced
+
+    async def _wait_for_request_slot(self) -> None:
+        """
+        Paces requests so that they are sent at most once per request interval, rather than in
+        bursts that trip the website's rate limiting. Each caller reserves the next free slot
+        before waiting for it, so concurrent callers are spaced out without needing a lock.
+        """
+        if not self.request_interval:
+            return
+        now = asyncio.get_running_loop().time()
+        request_time = max(now, self.next_request_time)
+        self.next_request_time = request_time + self.request_interval
+        if request_time > now:
+            await asyncio.sleep(request_time - now)
+
     @async_lru.alru_cache(maxsize=128)
     async def _get_soup(self, url: str) -> BeautifulSoup:
         """
@@ -118,16 +172,22 @@ class WebsiteScraper(Retriever, abc.ABC):
         if not self.session or self.session.closed:
             await self.start_session()
         assert self.session
+        await self._wait_for_request_slot()
         async with self.session.get(url) as response:
             self.requests_made += 1
             if response.status == HTTPStatus.TOO_MANY_REQUESTS:
-                raise RateLimitException()
+                retry_after = response.headers.get("Retry-After", "")
+                raise RateLimitException(float(retry_after) if retry_after.isdigit() else None)
             if (response_url := str(response.url)) != url:
                 raise RedirectException(
                     message=f"URL redirected from {url} to {response_url}",
                     response_url=response_url,
                 )
-            return BeautifulSoup(await response.text(), "html.parser")
+            # The declared charset (or UTF-8) is used directly, skipping aiohttp's charset detection
+            html = (await response.read()).decode(response.charset or "utf-8", errors="replace")
+        # lxml is a C parser, so is considerably faster than the pure Python html.parser. Parsing is
+        # still CPU-bound, so is run in a thread to keep the event loop free for other requests
+        return await asyncio.to_thread(BeautifulSoup, html, "lxml")
 
 
 class APIRetriever(Retriever, abc.ABC):
@@ -142,23 +202,49 @@ class OpenAIAPIRetriever(APIRetriever):
     """
 
     available_language_pairs: list[tuple[Language, Language]] = []
+    batch_size: int = 20  # Keeps each response comfortably within the model's output token limit
     client: AsyncOpenAI
     model: OpenAIModel | None = None
 
     def __init__(
-        self, language_from: Language, language_to: Language, concise_mode: bool = False
+        self,
+        language_from: Language,
+        language_to: Language,
+        concise_mode: bool = False,
+        connection_limit: int = 100,
     ) -> None:
-        super().__init__(language_from=language_from, language_to=language_to)
+        super().__init__(
+            language_from=language_from,
+            language_to=language_to,
+            connection_limit=connection_limit,
+        )
         load_dotenv()
         self.api_key = os.getenv("OPENAI_API_KEY")
         if not self.api_key:
             raise Exception("No OpenAI API key found - please set OPENAI_API_KEY in .env")
         self.client = AsyncOpenAI(api_key=self.api_key)
 
+        # Silence the per-request logs of the OpenAI client once, rather than disabling all logging
+        # around every request
+        for logger_name in ("openai", "httpx", "httpcore"):
+            logging.getLogger(logger_name).setLevel(logging.CRITICAL + 1)
+
     @staticmethod
     def name() -> str:
         return "OpenAI"
 
+    @staticmethod
+    @functools.lru_cache(maxsize=8)
+    def _system_prompt(language_from: Language, language_to: Language) -> str:
+        """
+        Returns the system prompt for a given language pair. The prompt is several kilobytes long
+        and only depends on the language pair, so it is formatted once per pair rather than once
+        per word.
+        """
+        return OPENAI_SYSTEM_PROMPT.format(
+            language_from=language_from.value, language_to=language_to.value
+        )
+
     def set_language_from(self) -> None:
         """
         Get language from user - done via command line for now to keep things simple
@@ -189,11 +275,11 @@ class OpenAIAPIRetriever(APIRetriever):
             except ValueError:
                 print("Invalid model, please try again.")
 
-    async def retrieve_translations(self, word_to_translate: str) -> list[Translation]:
+    async def _request_json(self, user_prompt: str, **prompt_kwargs: str) -> dict[str, Any] | None:
         """
-        Retrieves translations for a given word by requesting that the OpenAI API responds with
-        structured JSON data that can be easily parsed into Translation, Definition and SentencePair
-        objects.
+        Sends a user prompt, formatted with the language pair and any given keyword arguments, to
+        the OpenAI API alongside the system prompt, and returns the JSON object that the model
+        responds with, or None if the response is empty.
         """
         if not self.language_from:
             self.set_language_from()
@@ -201,61 +287,89 @@ class OpenAIAPIRetriever(APIRetriever):
             self.set_model()
         assert self.language_from
         assert self.model
-        try:
-            logging.disable(logging.CRITICAL)
-            response = await self.client.chat.completions.create(
-                model=self.model.value,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": OPENAI_SYSTEM_PROMPT.format(
-                            language_from=self.language_from.value,
-                            language_to=self.language_to.value,
-                        ),
-                    },
-                    {
-                        "role": "user",
-                        "content": OPENAI_USER_PROMPT.format(
-                            language_from=self.language_from.value,
-                            language_to=self.language_to.value,
-                            word_to_translate=word_to_translate,
-                        ),
-                    },
-                ],
-            )
-        finally:
-            logging.disable(logging.NOTSET)
+        response = await self.client.chat.completions.create(
+            model=self.model.value,
+            messages=[
+                {
+                    "role": "system",
+                    "content": self._system_prompt(self.language_from, self.language_to),
+                },
+                {
+                    "role": "user",
+                    "content": user_prompt.format(
+                        language_from=self.language_from.value,
+                        language_to=self.language_to.value,
+                        **prompt_kwargs,
+                    ),
+                },
+            ],
+        )
         self.requests_made += 1
         if not (content := response.choices[0].message.content):
-            return []
-        response_json: dict[str, Any] = json.loads(content)
-        translation_dicts = response_json["translations"]
-        translations = []
-        for translation_dict in translation_dicts:
-            definitions = []
-            for definition_dict in translation_dict["definitions"]:
-                sentence_pairs = []
-                for sentence_pair_dict in definition_dict["sentence_pairs"]:
-                    sentence_pair = SentencePair(
-                        source_sentence=sentence_pair_dict["source_sentence"],
-                        target_sentence=sentence_pair_dict["target_sentence"],
-                    )
-                    sentence_pairs.append(sentence_pair)
-                definition = Definition(
-                    text=definition_dict["text"],
-                    sentence_pairs=sentence_pairs,
-                    max_sentence_pairs=(1 if self.concise_mode else 3),
-                )
-                definitions.append(definition)
-            translation = Translation(
+            return None
+        response_json: dict[str, Any] = orjson.loads(content)
+        return response_json
+
+    def _translations_from_dicts(
+        self, translation_dicts: list[dict[str, Any]]
+    ) -> list[Translation]:
+        """Creates Translation objects from the translation dictionaries in an API response."""
+        max_items = 1 if self.concise_mode else 3
+        return [
+            Translation(
                 word_to_translate=translation_dict["word_to_translate"],
                 part_of_speech=translation_dict["part_of_speech"],
-                definitions=definitions,
+                definitions=[
+                    Definition(
+                        text=definition_dict["text"],
+                        sentence_pairs=[
+                            SentencePair(
+                                source_sentence=sentence_pair_dict["source_sentence"],
+                                target_sentence=sentence_pair_dict["target_sentence"],
+                            )
+                            for sentence_pair_dict in definition_dict["sentence_pairs"]
+                        ],
+                        max_sentence_pairs=max_items,
+                    )
+                    for definition_dict in translation_dict["definitions"]
+                ],
                 retriever=self,
-                max_definitions=(1 if self.concise_mode else 3),
+                max_definitions=max_items,
             )
-            translations.append(translation)
-        return translations
+            for translation_dict in translation_dicts
+        ]
+
+    async def retrieve_translations(self, word_to_translate: str) -> list[Translation]:
+        """
+        Retrieves translations for a given word by requesting that the OpenAI API responds with
+        structured JSON data that can be easily parsed into Translation, Definition and SentencePair
+        objects.
+        """
+        response_json = await self._request_json(
+            OPENAI_USER_PROMPT, word_to_translate=word_to_translate
+        )
+        if not response_json:
+            return []
+        return self._translations_from_dicts(response_json["translations"])
+
+    async def retrieve_translations_batch(
+        self, words_to_translate: list[str]
+    ) -> dict[str, list[Translation]]:
+        """
+        Retrieves translations for several words with a single request to the OpenAI API. Words
+        that the model does not return a result for are left out of the returned dictionary.
+        """
+        response_json = await self._request_json(
+            OPENAI_BATCH_USER_PROMPT, words_to_translate="\n".join(words_to_translate)
+        )
+        if not response_json:
+            return {}
+        requested_words = set(words_to_translate)
+        return {
+            result["word"]: self._translations_from_dicts(result["translations"])
+            for result in response_json["results"]
+            if result["word"] in requested_words
+        }
 
 
 class SpanishDictWebsiteScraper(WebsiteScraper):
@@ -269,6 +383,8 @@ class SpanishDictWebsiteScraper(WebsiteScraper):
         (Language.SPANISH, Language.ENGLISH),
     ]
     base_url: str = "https://www.spanishdict.com"
+    link_template: str
+    reverse_link_template: str
     lang_shortener = {
         Language.ENGLISH: "en",
         Language.SPANISH: "es",
@@ -278,11 +394,27 @@ class SpanishDictWebsiteScraper(WebsiteScraper):
     def name() -> str:
         return "SpanishDict"
 
+    def __init__(
+        self,
+        language_from: Language,
+        language_to: Language,
+        concise_mode: bool = False,
+        connection_limit: int = 100,
+    ) -> None:
+        super().__init__(language_from, language_to, concise_mode, connection_limit)
+        # Everything in the URLs but the word is fixed for the instance, so is formatted only once
+        self.link_template = (
+            f"{self.base_url}/translate/%s?langFrom={self.lang_shortener[self.language_from]}"
+        )
+        self.reverse_link_template = (
+            f"{self.base_url}/translate/%s?langFrom={self.lang_shortener[self.language_to]}"
+        )
+
     def link(self, word_to_translate: str) -> str | None:
-        return f"{self.base_url}/translate/{self._standardize(word_to_translate)}?langFrom={self.lang_shortener[self.language_from]}"
+        return self.link_template % self._standardize(word_to_translate)
 
     def reverse_link(self, definition: str) -> str | None:
-        return f"{self.base_url}/translate/{self._standardize(definition)}?langFrom={self.lang_shortener[self.language_to]}"
+        return self.reverse_link_template % self._standardize(definition)
 
     def _get_translation_from_part_of_speech_div(
         self, word_to_translate: str, part_of_speech_div: Tag
@@ -300,6 +432,9 @@ class SpanishDictWebsiteScraper(WebsiteScraper):
             .text
         )
         definition_divs: list[Tag] = part_of_speech_div.find_all(class_="tmBfjszm")
+        # The sentence span filters are the same for every marker tag, so are built once here
+        source_sentence_attrs = {"lang": self.lang_shortener[self.language_from]}
+        target_sentence_attrs = {"lang": self.lang_shortener[self.language_to]}
         definitions: list[Definition] = []
         for definition_div in definition_divs:
             signal_tag = definition_div.find("a")
@@ -312,10 +447,10 @@ class SpanishDictWebsiteScraper(WebsiteScraper):
                 marker_tag_parent = marker_tag.parent
                 marker_tag_grandparent = marker_tag_parent.parent  # type: ignore[union-attr]
                 source_sentence_span = marker_tag_grandparent.find(  # type: ignore[union-attr]
-                    "span", {"lang": self.lang_shortener[self.language_from]}
+                    "span", source_sentence_attrs
                 )
                 target_sentence_span = marker_tag_grandparent.find(  # type: ignore[union-attr]
-                    "span", {"lang": self.lang_shortener[self.language_to]}
+                    "span", target_sentence_attrs
                 )
                 if not source_sentence_span or not target_sentence_span:
                     continue
@@ -342,7 +477,7 @@ class SpanishDictWebsiteScraper(WebsiteScraper):
         )  # Don't want to specify max_definitions as quickdef definitions may be lost
 
     def _strip_article(self, word: str) -> str:
-        return re.sub(r"^(el|la|el/la)\s+", "", word, flags=re.IGNORECASE)
+        return ARTICLE_PATTERN.sub("", word)
 
     async def retrieve_translations(self, word_to_translate: str) -> list[Translation]:
         """
@@ -350,13 +485,21 @@ class SpanishDictWebsiteScraper(WebsiteScraper):
         then creating a separate Translation object for each part of speech listed in the
         "Dictionary" pane.
         """
-        lang_from = self.lang_shortener[self.language_from]
         try:
             soup = await self._get_soup(self.link(word_to_translate))
         except ValueError:
             raise ValueError(
                 f"URL redirect occurred for '{word_to_translate}' - are you sure it is a valid {self.language_from.value.title()} word?"
             )
+        # Walking the parsed page is CPU-bound, so is run in a thread like the parse itself
+        return await asyncio.to_thread(self._translations_from_soup, soup)
+
+    def _translations_from_soup(self, soup: BeautifulSoup) -> list[Translation]:
+        """
+        Creates a separate Translation object for each part of speech listed in the "Dictionary"
+        pane of a parsed dictionary page, filtered down to the quick definitions in concise mode.
+        """
+        lang_from = self.lang_shortener[self.language_from]
         word_to_translate = soup.find("h1", class_="MskJYfNq").text  # type: ignore[union-attr]
         dictionary_neodict_div = soup.find("div", id=f"dictionary-neodict-{lang_from}")
         if not dictionary_neodict_div:
@@ -377,17 +520,17 @@ class SpanishDictWebsiteScraper(WebsiteScraper):
             quickdef_divs: list[Tag] = soup.find_all(
                 id=lambda x: x and x.startswith("quickdef") and x.endswith(lang_from)
             )
-            quickdefs = [(a.text if (a := d.find("a")) else d.text) for d in quickdef_divs]
-            quickdef_translations: set[Translation] = set()
+            quickdefs = {
+                self._strip_article(a.text if (a := d.find("a")) else d.text) for d in quickdef_divs
+            }  # Articles are stripped once per quickdef rather than once per comparison
+            quickdef_translations: list[Translation] = []
             for translation in all_translations:
                 translation.definitions = [
-                    d
-                    for d in translation.definitions
-                    if any(self._strip_article(d.text) == self._strip_article(q) for q in quickdefs)
+                    d for d in translation.definitions if self._strip_article(d.text) in quickdefs
                 ]
                 if translation.definitions:
-                    quickdef_translations.add(translation)
-            all_translations = list(quickdef_translations)
+                    quickdef_translations.append(translation)
+            all_translations = quickdef_translations
         return all_translations
 
 
@@ -454,6 +597,13 @@ class CollinsWebsiteScraper(WebsiteScraper):
 
     async def retrieve_translations(self, word_to_translate: str) -> list[Translation]:
         soup = await self._get_soup(self.link(word_to_translate))
+        # Walking the parsed page is CPU-bound, so is run in a thread like the parse itself
+        return await asyncio.to_thread(self._translations_from_soup, word_to_translate, soup)
+
+    def _translations_from_soup(
+        self, word_to_translate: str, soup: BeautifulSoup
+    ) -> list[Translation]:
+        """Creates a Translation object for each part of speech on a parsed dictionary page."""
         if soup.text.find("Enable JavaScript and cookies to continue") != -1:
             raise ValueError(
                 "Collins online Spanish dictionary remains scrape-resistant, owing to Cloudflare's anti-bot protection"
@@ -491,6 +641,8 @@ class WordReferenceWebsiteScraper(WebsiteScraper):
         (Language.SPANISH, Language.PORTUGUESE),
     ]
     base_url = "https://www.wordreference.com"
+    link_template: str
+    reverse_link_template: str
     lang_shortener = {
         Language.ENGLISH: "en",
         Language.FRENCH: "fr",
@@ -504,29 +656,52 @@ class WordReferenceWebsiteScraper(WebsiteScraper):
     def name() -> str:
         return "WordReference"
 
-    def link(self, word_to_translate: str) -> str | None:
+    def __init__(
+        self,
+        language_from: Language,
+        language_to: Language,
+        concise_mode: bool = False,
+        connection_limit: int = 100,
+    ) -> None:
+        super().__init__(language_from, language_to, concise_mode, connection_limit)
+        # Everything in the URLs but the word is fixed for the instance, so is formatted only once
         if (self.language_from, self.language_to) == (Language.ENGLISH, Language.SPANISH):
-            return f"{self.base_url}/es/translation.asp?tranword={self._standardize(word_to_translate)}"
+            self.link_template = f"{self.base_url}/es/translation.asp?tranword=%s"
+            self.reverse_link_template = f"{self.base_url}/es/en/translation.asp?spen=%s"
         elif (self.language_from, self.language_to) == (Language.SPANISH, Language.ENGLISH):
-            return (
-                f"{self.base_url}/es/en/translation.asp?spen={self._standardize(word_to_translate)}"
+            self.link_template = f"{self.base_url}/es/en/translation.asp?spen=%s"
+            self.reverse_link_template = f"{self.base_url}/es/translation.asp?tranword=%s"
+        else:
+            lang_pair = (
+                self.lang_shortener[self.language_from] + self.lang_shortener[self.language_to]
             )
-        return f"{self.base_url}/{self.lang_shortener[self.language_from]}{self.lang_shortener[self.language_to]}/{self._standardize(word_to_translate)}"
+            self.link_template = f"{self.base_url}/{lang_pair}/%s"
+            self.reverse_link_template = self.link_template
+
+    def link(self, word_to_translate: str) -> str | None:
+        return self.link_template % self._standardize(word_to_translate)
 
     def reverse_link(self, definition: str) -> str | None:
-        if (self.language_from, self.language_to) == (Language.ENGLISH, Language.SPANISH):
-            return f"{self.base_url}/es/en/translation.asp?spen={self._standardize(definition)}"
-        elif (self.language_from, self.language_to) == (Language.SPANISH, Language.ENGLISH):
-            return f"{self.base_url}/es/translation.asp?tranword={self._standardize(definition)}"
-        return f"{self.base_url}/{self.lang_shortener[self.language_from]}{self.lang_shortener[self.language_to]}/{self._standardize(definition)}"
+        return self.reverse_link_template % self._standardize(definition)
 
     def _from_word_from_FrWrd_tag(self, FrWrd_tag: Tag) -> str:
-        decompose_tags: list[Tag] = FrWrd_tag.find_all(["a", "span"])
-        for dt in decompose_tags:
-            dt.decompose()
-        text = FrWrd_tag.find("strong").text.split(",")[0]  # type: ignore[union-attr]
+        """
+        Returns the word in the <strong> tag of a FrWrd cell, ignoring the text of any <a> and
+        <span> tags within the cell. The tree is left unmodified, as the soup may be cached.
+        """
+
+        def is_ignored(string: NavigableString) -> bool:
+            parent = string.parent
+            while parent is not None and parent is not FrWrd_tag:
+                if parent.name in ("a", "span"):
+                    return True
+                parent = parent.parent
+            return False
+
+        strong_tag: Tag = FrWrd_tag.find("strong")  # type: ignore[assignment]
+        text = "".join(s for s in strong_tag.strings if not is_ignored(s)).split(",")[0]  # type: ignore[arg-type]
         text = text.strip()  # Remove leading and trailing whitespace
-        text = re.sub(r"\s+", " ", text)  # Replace multiple spaces with a single space
+        text = WHITESPACE_PATTERN.sub(" ", text)  # Replace multiple spaces with a single space
         return text
 
     async def retrieve_translations(self, word_to_translate: str) -> list[Translation]:
@@ -534,20 +709,22 @@ class WordReferenceWebsiteScraper(WebsiteScraper):
         table = soup.find("table", class_="WRD")
         trs: list[Tag] = table.find_all("tr")  # type: ignore[union-attr]
         translation_dict: dict[tuple[str, str], dict[str, SentencePair]] = {}
-        for class_, grouper in itertools.groupby(
+        for class_, rows in itertools.groupby(
             trs, lambda x: c[0] if (c := x.get("class")) else None
         ):
             if class_ not in ("even", "odd"):
                 continue
-            rows: list[Tag] = list(grouper)
-            FrWrd_tag: Tag = next((row.find("td", class_="FrWrd") for row in rows), None)  # type: ignore
-            pos_tag = next((row.find("em", class_="POS2") for row in rows), None)
-            ToWrd_tag = next((row.find("td", class_="ToWrd") for row in rows), None)
+            # The words and part of speech are in the first row of each group, so the rows are
+            # streamed in a single pass rather than collected into a list and scanned repeatedly
+            first_row: Tag = next(rows)
+            FrWrd_tag: Tag = first_row.find("td", class_="FrWrd")  # type: ignore[assignment]
+            pos_tag = first_row.find("em", class_="POS2")
+            ToWrd_tag = first_row.find("td", class_="ToWrd")
             from_word = self._from_word_from_FrWrd_tag(FrWrd_tag)
             part_of_speech = pos_tag.text  # type: ignore[union-attr]
             to_word = ToWrd_tag.contents[0].strip()  # type: ignore[union-attr]
             from_example, to_example = None, None
-            for row in rows:
+            for row in itertools.chain((first_row,), rows):
                 if not from_example:
                     from_example = t.text.strip() if (t := row.find("td", class_="FrEx")) else None
                 if not to_example:
@@ -566,24 +743,24 @@ class WordReferenceWebsiteScraper(WebsiteScraper):
                     source_sentence=from_example,
                     target_sentence=to_example,
                 )
-        translations = []
-        for (from_word, part_of_speech), definition_data in translation_dict.items():
-            definitions = []
-            for definition_text, sentence_pair in definition_data.items():
-                definition = Definition(
-                    text=definition_text,
-                    sentence_pairs=[sentence_pair],
-                    max_sentence_pairs=(1 if self.concise_mode else 3),
-                )
-                definitions.append(definition)
-            translation = Translation(
+        max_items = 1 if self.concise_mode else 3
+        translations = [
+            Translation(
                 word_to_translate=from_word,
                 part_of_speech=part_of_speech,
-                definitions=definitions,
+                definitions=[
+                    Definition(
+                        text=definition_text,
+                        sentence_pairs=[sentence_pair],
+                        max_sentence_pairs=max_items,
+                    )
+                    for definition_text, sentence_pair in definition_data.items()
+                ],
                 retriever=self,
-                max_definitions=(1 if self.concise_mode else 3),
+                max_definitions=max_items,
             )
-            translations.append(translation)
+            for (from_word, part_of_speech), definition_data in translation_dict.items()
+        ]
         return translations[:3] if self.concise_mode else translations
 
 
@@ -604,8 +781,9 @@ class RetrieverFactory:
         language_from: Language,
         language_to: Language,
         concise_mode: bool = False,
+        connection_limit: int = 100,
     ) -> Retriever:
-        return retriever_type.value(language_from, language_to, concise_mode)  # type: ignore[no-any-return]
+        return retriever_type.value(language_from, language_to, concise_mode, connection_limit)  # type: ignore[no-any-return]
 
 
 def valid_retriever_type(retriever_type: str) -> RetrieverType:
@@ -637,15 +815,19 @@ async def main(
             concise_mode=concise_mode,
         )
         translations = await retriever.retrieve_translations(word_to_translate)
-        s = ""
+        parts: list[str] = []  # Joined once, rather than concatenated a piece at a time
         for translation in translations:
-            s += f"{PC.GREEN}{translation.word_to_translate} {PC.CYAN}({translation.part_of_speech}){PC.GREEN} - {', '.join([definition.text for definition in translation.definitions])}{PC.RESET}"
+            parts.append(
+                f"{PC.GREEN}{translation.word_to_translate} {PC.CYAN}({translation.part_of_speech}){PC.GREEN} - {', '.join([definition.text for definition in translation.definitions])}{PC.RESET}"
+            )
             for definition in translation.definitions:
-                s += f"\n   {PC.YELLOW}{definition.text}{PC.RESET}"
+                parts.append(f"\n   {PC.YELLOW}{definition.text}{PC.RESET}")
                 for sentence_pair in definition.sentence_pairs:
-                    s += f"\n      {PC.BLUE}{sentence_pair.source_sentence}{PC.RESET} - {PC.PURPLE}{sentence_pair.target_sentence}{PC.RESET}"
-            s += "\n\n"
-        print(s)
+                    parts.append(
+                        f"\n      {PC.BLUE}{sentence_pair.source_sentence}{PC.RESET} - {PC.PURPLE}{sentence_pair.target_sentence}{PC.RESET}"
+                    )
+            parts.append("\n\n")
+        print("".join(parts))
     except Exception as e:
         print(e)
     finally:
@@ -14,14 +14,8 @@ class Source(abc.ABC):
     """An abstract base class that represents a source of words to be translated."""
 
     def _deduplicate(self, words_to_translate: list[str]) -> list[str]:
-        """Removes duplicates from a list of words."""
-        seen = set()
-        unique_words: list[str] = []
-        for word in words_to_translate:
-            if word not in seen:
-                seen.add(word)
-                unique_words.append(word)
-        return unique_words
+        """Removes duplicates from a list of words, preserving order."""
+        return list(dict.fromkeys(words_to_translate))
 
     @abc.abstractmethod
     def get_words_to_translate(self) -> list[str]:
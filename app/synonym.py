@@ -1,29 +1,38 @@
 import argparse
+import functools
+import itertools
+import sys
 
 from nltk.corpus import wordnet
-from nltk.corpus.reader.wordnet import Lemma, Synset
 
 
 class SynonymChecker:
     """A class with various methods related to checking if words are synonyms."""
 
     @staticmethod
-    def get_synonyms(word: str, pos: str = "n") -> set[str]:
-        """Returns a set of synonyms for the given word."""
-        synonyms = set()
-        for synset in wordnet.synsets(word, pos=pos):
-            assert isinstance(synset, Synset)
-            for lemma in synset.lemmas():
-                assert isinstance(lemma, Lemma)
-                synonyms.add(lemma.name())
-        return synonyms
+    @functools.lru_cache(maxsize=8192)
+    def get_synonyms(word: str, pos: str = "n") -> frozenset[str]:
+        """
+        Returns a set of synonyms for the given word. Results are cached, as reading WordNet is slow
+        and the same words are checked repeatedly, so the set is frozen to keep it shareable.
+        """
+        # Synsets already hold their lemma names as strings, so no Lemma objects need to be built.
+        # Names are interned, so lemmas shared between synonym sets compare by identity
+        return frozenset(
+            map(
+                sys.intern,
+                itertools.chain.from_iterable(
+                    synset.lemma_names() for synset in wordnet.synsets(word, pos=pos)
+                ),
+            )
+        )
 
     @staticmethod
     def are_synonymous(word1: str, word2: str, pos: str = "n") -> bool:
         """Returns True if the two words are synonyms, False otherwise."""
-        synonyms_word1 = SynonymChecker.get_synonyms(word1, pos=pos)
-        synonyms_word2 = SynonymChecker.get_synonyms(word2, pos=pos)
-        return bool(synonyms_word1 & synonyms_word2)
+        synonyms_word1 = SynonymChecker.get_synonyms(word1, pos)
+        synonyms_word2 = SynonymChecker.get_synonyms(word2, pos)
+        return not synonyms_word1.isdisjoint(synonyms_word2)
 
     @staticmethod
     def mark_synonymous_words(words: list[str], pos: str = "n") -> list[int]:
@@ -32,13 +41,12 @@ class SynonymChecker:
         synonymous with an earlier word in the list.
         """
         marks = [0] * len(words)
-        synonym_groups = [SynonymChecker.get_synonyms(word, pos) for word in words]
-        for i in range(len(synonym_groups)):
-            comparator = synonym_groups[i]
-            for j in range(len(synonym_groups))[i + 1 :]:
-                comparand = synonym_groups[j]
-                if comparator & comparand:
-                    marks[j] = 1
+        seen_synonyms: set[str] = set()  # Synonyms of every earlier word, checked in a single pass
+        for i, word in enumerate(words):
+            synonyms = SynonymChecker.get_synonyms(word, pos)
+            if not seen_synonyms.isdisjoint(synonyms):
+                marks[i] = 1
+            seen_synonyms |= synonyms
         return marks
 
 
@@ -46,10 +54,10 @@ def main(args: argparse.Namespace) -> None:
     """Prints synonyms for two words and whether or not they are synonymous."""
     word_1 = args.words[0]
     word_1_synonyms = SynonymChecker.get_synonyms(word_1, args.pos)
-    print(f"Synonyms for {word_1}: {word_1_synonyms}")
+    print(f"Synonyms for {word_1}: {sorted(word_1_synonyms)}")
     word_2 = args.words[1]
     word_2_synonyms = SynonymChecker.get_synonyms(word_2, args.pos)
-    print(f"Synonyms for {word_2}: {word_2_synonyms}")
+    print(f"Synonyms for {word_2}: {sorted(word_2_synonyms)}")
     synonymous = SynonymChecker.are_synonymous(args.words[0], args.words[1], args.pos)
     print(f"Are {word_1} and {word_2} synonymous? {synonymous}")
 
@@ -0,0 +1,109 @@
+import asyncio
+import os
+import tempfile
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.constant import Language
+from app.dictionary import Dictionary
+from app.language_element import Definition, SentencePair, Translation
+from app.retriever import SpanishDictWebsiteScraper
+
+
+@pytest.fixture
+def translation() -> Translation:
+    return Translation(
+        word_to_translate="prueba",
+        part_of_speech="feminine noun",
+        definitions=[
+            Definition(
+                text="test",
+                sentence_pairs=[
+                    SentencePair(
+                        source_sentence="Source sentence", target_sentence="Target sentence"
+                    ),
+                ],
+            ),
+        ],
+    )
+
+
+@pytest.fixture
+def retriever(translation: Translation) -> SpanishDictWebsiteScraper:
+    retriever = MagicMock(spec=SpanishDictWebsiteScraper)
+    retriever.language_from = Language.SPANISH
+    retriever.language_to = Language.ENGLISH
+    retriever.concise_mode = False
+    retriever.retrieve_translations = AsyncMock(return_value=[translation])
+    return retriever
+
+
+@pytest.mark.asyncio
+async def test_translate_without_retriever() -> None:
+    dictionary = Dictionary()
+    assert await dictionary.translate("prueba") == []
+
+
+@pytest.mark.asyncio
+async def test_translate_deduplicates_concurrent_requests(
+    retriever: SpanishDictWebsiteScraper, translation: Translation
+) -> None:
+    dictionary = Dictionary(retriever=retriever)
+    results = await asyncio.gather(*[dictionary.translate("prueba") for _ in range(3)])
+    assert results == [[translation]] * 3
+    assert retriever.retrieve_translations.call_count == 1
+    assert dictionary.locks == {}  # Locks are freed once the word has been retrieved
+
+
+@pytest.mark.asyncio
+async def test_translate_persists_between_instances(
+    retriever: SpanishDictWebsiteScraper, translation: Translation
+) -> None:
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache_path = os.path.join(temp_dir, "cache.sqlite")
+        dictionary = Dictionary(retriever=retriever, cache_path=cache_path)
+        assert await dictionary.translate("prueba") == [translation]
+        dictionary.close()
+
+        dictionary = Dictionary(retriever=retriever, cache_path=cache_path)
+        translations = await dictionary.translate("prueba")
+        dictionary.close()
+        assert translations == [translation]
+        assert translations[0].retriever is retriever
+        assert retriever.retrieve_translations.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_prefetch_retrieves_in_batches(
+    retriever: SpanishDictWebsiteScraper, translation: Translation
+) -> None:
+    retriever.batch_size = 2
+    retriever.retrieve_translations_batch = AsyncMock(
+        side_effect=lambda words: {word: [translation] for word in words}
+    )
+    dictionary = Dictionary(retriever=retriever)
+    await dictionary.prefetch(["uno", "dos", "tres"])
+    assert retriever.retrieve_translations_batch.call_count == 2
+    assert await dictionary.translate("tres") == [translation]
+    assert retriever.retrieve_translations.call_count == 0
+
+
+@pytest.mark.asyncio
+async def test_prefetch_loads_cached_translations(
+    retriever: SpanishDictWebsiteScraper, translation: Translation
+) -> None:
+    retriever.batch_size = 1
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache_path = os.path.join(temp_dir, "cache.sqlite")
+        dictionary = Dictionary(retriever=retriever, cache_path=cache_path)
+        await dictionary.translate("prueba")
+        dictionary.close()
+
+        dictionary = Dictionary(retriever=retriever, cache_path=cache_path)
+        await dictionary.prefetch(["prueba", "otra"])
+        dictionary.close()
+        assert "otra" not in dictionary.translations
+        assert dictionary.translations["prueba"] == [translation]
+        assert dictionary.translations["prueba"][0].retriever is retriever
+        assert retriever.retrieve_translations.call_count == 1
@@ -1,8 +1,12 @@
 import os
+import pathlib
+import sqlite3
+import zipfile
 
 import pytest
+from genanki import Deck, Model, Note, Package
 
-from app.genanki_extension import load_decks_from_package
+from app.genanki_extension import BatchedPackage, load_decks_from_package
 
 SCRIPT_DIR = os.path.dirname(os.path.realpath(__file__))
 TEST_GENANKI_EXTENSION_DIR = SCRIPT_DIR + "/data/test_genanki_extension/"
@@ -43,3 +47,32 @@ def test_load_decks_from_package_success(apkg_file_path: str) -> None:
             note_found = True
             break
     assert note_found, "Note with the specified fields was not found."
+
+
+def test_batched_package_matches_package(tmp_path: pathlib.Path) -> None:
+    template = {"name": "Card 1", "qfmt": "{{Front}}", "afmt": "{{FrontSide}}"}
+    model = Model(1, "Model", fields=[{"name": "Front"}], templates=[template])
+    deck = Deck(2, "Deck")
+    for i in range(25):
+        deck.add_note(Note(model=model, fields=[f"Word {i}"]))
+
+    rows = []
+    for package_cls in (Package, BatchedPackage):
+        apkg_path = str(tmp_path / f"{package_cls.__name__}.apkg")
+        package_cls(deck).write_to_file(apkg_path, timestamp=0)
+        with zipfile.ZipFile(apkg_path) as z:
+            z.extract("collection.anki2", tmp_path / package_cls.__name__)
+        conn = sqlite3.connect(tmp_path / package_cls.__name__ / "collection.anki2")
+        rows.append(
+            [
+                conn.execute(f"SELECT * FROM {table} ORDER BY id").fetchall()
+                for table in ("notes", "cards")
+            ]
+            + [conn.execute("SELECT decks, models FROM col").fetchone()]
+        )
+        conn.close()
+    assert rows[0] == rows[1]
+    assert len(rows[1][0]) == 25
+
+    decks = load_decks_from_package(str(tmp_path / "BatchedPackage.apkg"))
+    assert [note.fields for note in decks[0].notes] == [note.fields for note in deck.notes]
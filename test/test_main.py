@@ -7,8 +7,15 @@ import pytest
 from genanki import Note as AnkiNote
 
 from app.dictionary import Dictionary
+from app.exception import RateLimitException
 from app.genanki_extension import load_decks_from_package
-from app.main import create_deck, valid_input_path, valid_output_anki_package_path
+from app.main import (
+    create_deck,
+    deduplicate_words,
+    valid_input_path,
+    valid_output_anki_package_path,
+    valid_positive_float,
+)
 from app.note_creator import NoteCreator, model
 from app.retriever import SpanishDictWebsiteScraper
 
@@ -50,6 +57,18 @@ def test_invalid_output_anki_package_path_wrong_extension():
             valid_output_anki_package_path(invalid_output_path)
 
 
+def test_valid_positive_float():
+    assert valid_positive_float("2.5") == 2.5
+    for invalid_value in ["0", "-1", "nan", "inf", "fast"]:
+        with pytest.raises(argparse.ArgumentTypeError):
+            valid_positive_float(invalid_value)
+
+
+def test_deduplicate_words():
+    words = ["hola", " hola", "Hola", "adiós", "", "hola ", "adiós"]
+    assert deduplicate_words(words) == ["hola", "adiós"]
+
+
 @pytest.mark.asyncio
 async def test_create_deck() -> None:
     anki_package_path = os.path.join(SCRIPT_DIR, "test.apkg")
@@ -99,7 +118,7 @@ async def test_create_deck() -> None:
         with patch("app.main.NoteCreator", return_value=note_creator):
             await create_deck(
                 words_to_translate=["hola", "adiós"],
-                retriever=MagicMock(spec=SpanishDictWebsiteScraper),
+                retriever=MagicMock(spec=SpanishDictWebsiteScraper, batch_size=1),
                 concurrency_limit=1,
                 note_limit=0,
                 output_anki_package_path=anki_package_path,
@@ -123,3 +142,128 @@ async def test_create_deck() -> None:
         # Delete output.apkg if it exists
         if os.path.exists(anki_package_path):
             os.remove(anki_package_path)
+
+
+@pytest.mark.asyncio
+async def test_create_deck_note_limit_stops_scheduling() -> None:
+    note = AnkiNote(model=model, fields=["123456789", "hola", "", "", "", "", ""])
+    note_creator = NoteCreator(
+        deck_id=123456789,
+        dictionary=MagicMock(spec=Dictionary),
+        concurrency_limit=1,
+    )
+    note_creator.rate_limited_create_notes = AsyncMock(return_value=[note])
+    with tempfile.TemporaryDirectory() as temp_dir:
+        with patch("app.main.NoteCreator", return_value=note_creator):
+            await create_deck(
+                words_to_translate=[f"word{i}" for i in range(100)],
+                retriever=MagicMock(spec=SpanishDictWebsiteScraper, batch_size=1),
+                concurrency_limit=1,
+                note_limit=1,
+                output_anki_package_path=os.path.join(temp_dir, "output.apkg"),
+            )
+    # The single worker reaches the limit on the first word. It has already started the second by
+    # the time its first result is read, as the result queue holds one result, and goes no further
+    assert note_creator.rate_limited_create_notes.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_create_deck_processes_known_words_first() -> None:
+    note = AnkiNote(model=model, fields=["123456789", "hola", "", "", "", "", ""])
+    retriever = MagicMock(spec=SpanishDictWebsiteScraper, batch_size=1)
+    dictionary = Dictionary(retriever=retriever)
+    dictionary.translations["conocida"] = []
+    note_creator = NoteCreator(deck_id=123456789, dictionary=dictionary, concurrency_limit=1)
+    note_creator.rate_limited_create_notes = AsyncMock(return_value=[note])
+    with tempfile.TemporaryDirectory() as temp_dir:
+        with (
+            patch("app.main.Dictionary", return_value=dictionary),
+            patch("app.main.NoteCreator", return_value=note_creator),
+        ):
+            await create_deck(
+                words_to_translate=["nueva", "conocida", "otra"],
+                retriever=retriever,
+                concurrency_limit=1,
+                output_anki_package_path=os.path.join(temp_dir, "output.apkg"),
+            )
+    words = [call.args[0] for call in note_creator.rate_limited_create_notes.call_args_list]
+    assert words == ["conocida", "nueva", "otra"]
+
+
+@pytest.mark.asyncio
+async def test_create_deck_note_limit_keeps_source_order() -> None:
+    note = AnkiNote(model=model, fields=["123456789", "hola", "", "", "", "", ""])
+    retriever = MagicMock(spec=SpanishDictWebsiteScraper, batch_size=1)
+    dictionary = Dictionary(retriever=retriever)
+    dictionary.translations["conocida"] = []
+    note_creator = NoteCreator(deck_id=123456789, dictionary=dictionary, concurrency_limit=1)
+    note_creator.rate_limited_create_notes = AsyncMock(return_value=[note])
+    with tempfile.TemporaryDirectory() as temp_dir:
+        with (
+            patch("app.main.Dictionary", return_value=dictionary),
+            patch("app.main.NoteCreator", return_value=note_creator),
+        ):
+            await create_deck(
+                words_to_translate=["nueva", "conocida", "otra"],
+                retriever=retriever,
+                concurrency_limit=1,
+                note_limit=10,
+                output_anki_package_path=os.path.join(temp_dir, "output.apkg"),
+            )
+    words = [call.args[0] for call in note_creator.rate_limited_create_notes.call_args_list]
+    assert words == ["nueva", "conocida", "otra"]
+
+
+@pytest.mark.asyncio
+async def test_create_deck_continues_after_word_error() -> None:
+    note = AnkiNote(
+        model=model, fields=["123456789", "hola", "hola", "interjection", "hello", "Hola", "Hello"]
+    )
+    note_creator = NoteCreator(
+        deck_id=123456789,
+        dictionary=MagicMock(spec=Dictionary),
+        concurrency_limit=1,
+    )
+    note_creator.rate_limited_create_notes = AsyncMock(side_effect=[RateLimitException(), [note]])
+    with tempfile.TemporaryDirectory() as temp_dir:
+        anki_package_path = os.path.join(temp_dir, "output.apkg")
+        with patch("app.main.NoteCreator", return_value=note_creator):
+            await create_deck(
+                words_to_translate=["adiós", "hola"],
+                retriever=MagicMock(spec=SpanishDictWebsiteScraper, batch_size=1),
+                concurrency_limit=1,
+                output_anki_package_path=anki_package_path,
+            )
+        decks = load_decks_from_package(anki_package_path)
+    assert [note.fields[1] for note in decks[0].notes] == ["hola"]
+
+
+@pytest.mark.asyncio
+async def test_create_deck_note_limit_skips_batch_prefetch() -> None:
+    note = AnkiNote(model=model, fields=["123456789", "hola", "", "", "", "", ""])
+    retriever = MagicMock(spec=SpanishDictWebsiteScraper, batch_size=20)
+    note_creator = NoteCreator(
+        deck_id=123456789,
+        dictionary=MagicMock(spec=Dictionary),
+        concurrency_limit=1,
+    )
+    note_creator.rate_limited_create_notes = AsyncMock(return_value=[note])
+    with tempfile.TemporaryDirectory() as temp_dir:
+        with patch("app.main.NoteCreator", return_value=note_creator):
+            await create_deck(
+                words_to_translate=[f"word{i}" for i in range(100)],
+                retriever=retriever,
+                concurrency_limit=1,
+                note_limit=1,
+                output_anki_package_path=os.path.join(temp_dir, "output.apkg"),
+            )
+    retriever.retrieve_translations_batch.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_create_deck_closes_session_when_prefetch_fails() -> None:
+    retriever = MagicMock(spec=SpanishDictWebsiteScraper, batch_size=1)
+    with patch("app.main.Dictionary.prefetch", side_effect=ValueError("corrupt cache")):
+        with pytest.raises(ValueError):
+            await create_deck(words_to_translate=["hola"], retriever=retriever)
+    retriever.close_session.assert_awaited_once()
@@ -132,6 +132,53 @@ async def test_rate_limited_create_notes_with_rate_limit_exception(
     assert note_creator.dictionary.translate.call_count == 2
 
 
+@pytest.mark.asyncio
+async def test_rate_limited_create_notes_with_concurrent_rate_limit_exceptions(
+    deck_id: int, field_values: list[str], retriever: Retriever, translation: Translation
+) -> None:
+    note_creator = NoteCreator(
+        deck_id=deck_id,
+        dictionary=MagicMock(spec=Dictionary, retriever=retriever),
+        concurrency_limit=2,
+    )
+    note_creator.dictionary.retriever.rate_limited = AsyncMock(return_value=False)
+    note_creator.dictionary.translate = AsyncMock(
+        side_effect=[RateLimitException, [translation], [translation]]
+    )
+
+    # Hold the first coroutine in its rate limit wait until the second is waiting to be admitted
+    gate = asyncio.Event()
+    asyncio.get_running_loop().call_later(0.01, gate.set)
+
+    async def sleep(_: float) -> None:
+        await gate.wait()
+
+    with patch("app.note_creator.asyncio.sleep", side_effect=sleep) as mock_sleep:
+        results = await asyncio.gather(
+            note_creator.rate_limited_create_notes("prueba"),
+            note_creator.rate_limited_create_notes("prueba"),
+        )
+    assert [notes[0].fields for notes in results] == [field_values, field_values]
+    assert mock_sleep.call_count == 1
+    assert note_creator.dictionary.retriever.rate_limited.call_count == 1
+    assert note_creator.dictionary.translate.call_count == 3  # The second was never rate limited
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_create_notes_waits_for_active_rate_limit(
+    field_values: list[str], note_creator: NoteCreator, translation: Translation
+) -> None:
+    note_creator.dictionary.translate.return_value = [translation]
+    note_creator.rate_limit_event.clear()  # As if another coroutine is handling a rate limit
+    task = asyncio.create_task(note_creator.rate_limited_create_notes("prueba"))
+    await asyncio.sleep(0)
+    assert note_creator.dictionary.translate.call_count == 0
+    note_creator.rate_limit_event.set()
+    notes = await task
+    assert notes[0].fields == field_values
+    assert note_creator.dictionary.translate.call_count == 1
+
+
 @pytest.mark.asyncio
 async def test_rate_limited_create_notes_with_redirect_exception(
     field_values: list[str], note_creator: NoteCreator, translation: Translation
@@ -9,6 +9,7 @@ from aioresponses import aioresponses
 from bs4 import BeautifulSoup
 
 from app.constant import Language, OpenAIModel
+from app.exception import RateLimitException
 from app.language_element import Definition, SentencePair, Translation
 from app.retriever import (
     CollinsWebsiteScraper,
@@ -109,8 +110,10 @@ def test_retriever_factory():
         retriever_type=RetrieverType.SPANISHDICT,
         language_from=Language.SPANISH,
         language_to=Language.ENGLISH,
+        connection_limit=3,
     )
     assert isinstance(spanishdict_retriever, SpanishDictWebsiteScraper)
+    assert spanishdict_retriever.connection_limit == 3
     wordreference_retriever = RetrieverFactory.create_retriever(
         retriever_type=RetrieverType.WORDREFERENCE,
         language_from=Language.SPANISH,
@@ -132,6 +135,29 @@ async def test_get_soup(mock_url: str, mock_website_scraper: WebsiteScraper) ->
         await mock_website_scraper.close_session()
 
 
+@pytest.mark.asyncio
+async def test_get_soup_rate_limited(mock_url: str, mock_website_scraper: WebsiteScraper) -> None:
+    try:
+        with aioresponses() as m:
+            m.get(mock_url, status=HTTPStatus.TOO_MANY_REQUESTS, headers={"Retry-After": "120"})
+            with pytest.raises(RateLimitException) as exc_info:
+                await mock_website_scraper._get_soup(mock_url)
+            assert exc_info.value.retry_after == 120
+    finally:
+        await mock_website_scraper.close_session()
+
+
+@pytest.mark.asyncio
+async def test_wait_for_request_slot_spaces_requests(mock_website_scraper: WebsiteScraper) -> None:
+    mock_website_scraper.request_interval = 0.5
+    with patch("app.retriever.asyncio.sleep", new_callable=AsyncMock) as mock_sleep:
+        for _ in range(3):
+            await mock_website_scraper._wait_for_request_slot()
+    # The first request is sent immediately, and each later one waits for its reserved slot
+    waits = [call.args[0] for call in mock_sleep.call_args_list]
+    assert waits == [pytest.approx(0.5, abs=0.05), pytest.approx(1.0, abs=0.05)]
+
+
 @pytest.fixture
 def test_word() -> str:
     return "prueba"
@@ -368,6 +394,52 @@ async def test_openai_api_retriever() -> None:
     assert translations == [expected_translation]
 
 
+@pytest.mark.asyncio
+async def test_openai_api_retriever_batch() -> None:
+    translation_dicts = {
+        word: {
+            "word_to_translate": word,
+            "part_of_speech": "interjection",
+            "definitions": [
+                {
+                    "text": text,
+                    "sentence_pairs": [
+                        {"source_sentence": f"¡{word}!", "target_sentence": f"{text}!"}
+                    ],
+                }
+            ],
+        }
+        for word, text in [("hola", "hello"), ("adiós", "goodbye")]
+    }
+    mock_openai_response = SimpleNamespace(
+        choices=[
+            SimpleNamespace(
+                message=SimpleNamespace(
+                    content=json.dumps(
+                        {
+                            "results": [
+                                {"word": word, "translations": [translation_dict]}
+                                for word, translation_dict in translation_dicts.items()
+                            ]
+                        }
+                    )
+                )
+            )
+        ]
+    )
+
+    mock_openai_client = AsyncMock()
+    mock_openai_client.chat.completions.create.return_value = mock_openai_response
+    with patch("os.getenv", return_value="mock_api_key"):
+        retriever = OpenAIAPIRetriever(language_from=Language.SPANISH, language_to=Language.ENGLISH)
+    retriever.client = mock_openai_client
+    retriever.model = OpenAIModel.GPT_4_TURBO
+    translations = await retriever.retrieve_translations_batch(["hola", "adiós"])
+    assert mock_openai_client.chat.completions.create.call_count == 1
+    assert list(translations) == ["hola", "adiós"]
+    assert translations["adiós"][0].definitions[0].text == "goodbye"
+
+
 @pytest.mark.asyncio
 async def test_collins_website_scraper(test_word: str) -> None:
     collins_url = f"https://www.collinsdictionary.com/dictionary/spanish-english/{test_word}"